@@ -3,15 +3,22 @@ import argparse
 import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 
 from datasets import load_dataset
 
 
+_WHITESPACE_RUN = re.compile(r"\s+")
+# Any whitespace other than a lone space, i.e. something the collapse would rewrite.
+_COLLAPSIBLE_WHITESPACE = re.compile(r"\s\s|[^\S ]")
+
+
 def normalize_line(text):
+    # ASCII is already NFC; if it has no whitespace to collapse, only strip it.
+    if text.isascii() and not _COLLAPSIBLE_WHITESPACE.search(text):
+        return text.strip()
     text = unicodedata.normalize("NFC", text)
-    text = text.replace("\n", " ")
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return _WHITESPACE_RUN.sub(" ", text).strip()
 
 
 def keep_line(text, min_chars, max_chars):
@@ -36,8 +43,10 @@ def download_language(dataset_name, lang, lines_per_lang, output_dir, min_chars,
             ) from exc
         raise
 
+    # Write to a temp file so an interrupted worker never leaves a partial shard.
+    tmp_path = out_path + ".tmp"
     kept = 0
-    with open(out_path, "wt", encoding="utf-8") as out:
+    with open(tmp_path, "wt", encoding="utf-8") as out:
         for row in stream:
             text = normalize_line(row.get("text", ""))
             if not keep_line(text, min_chars=min_chars, max_chars=max_chars):
@@ -46,6 +55,7 @@ def download_language(dataset_name, lang, lines_per_lang, output_dir, min_chars,
             kept += 1
             if kept >= lines_per_lang:
                 break
+    os.replace(tmp_path, out_path)
 
     return out_path, kept
 
@@ -85,6 +95,12 @@ def parse_args():
         default=1000,
         help="maximum normalized characters per line",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="languages streamed concurrently (<=0 means min(#langs, #cpus))",
+    )
     return parser.parse_args()
 
 
@@ -99,16 +115,25 @@ def main():
     print(f"Lines per language: {args.lines_per_lang}")
     print(f"Output dir: {args.output_dir}")
 
-    for lang in langs:
-        out_path, kept = download_language(
-            dataset_name=args.dataset,
-            lang=lang,
-            lines_per_lang=args.lines_per_lang,
-            output_dir=args.output_dir,
-            min_chars=args.min_chars,
-            max_chars=args.max_chars,
-        )
-        print(f"{lang}: wrote {kept} lines to {out_path}")
+    # Each language is an independent stream + writer; processes rather than threads
+    # so decompression and normalization of different shards run on separate cores.
+    workers = args.workers if args.workers > 0 else min(len(langs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                download_language,
+                dataset_name=args.dataset,
+                lang=lang,
+                lines_per_lang=args.lines_per_lang,
+                output_dir=args.output_dir,
+                min_chars=args.min_chars,
+                max_chars=args.max_chars,
+            )
+            for lang in langs
+        ]
+        for lang, future in zip(langs, futures):
+            out_path, kept = future.result()
+            print(f"{lang}: wrote {kept} lines to {out_path}")
 
 
 if __name__ == "__main__":
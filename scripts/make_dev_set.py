@@ -3,6 +3,8 @@ import argparse
 import glob
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from typing import List
 
 
@@ -16,18 +18,20 @@ def parse_args():
     return parser.parse_args()
 
 
+def read_valid_lines(path: str, min_len: int) -> List[str]:
+    try:
+        with open(path, "rt", encoding="utf-8", errors="ignore") as handle:
+            return [text for text in (line.rstrip("\n") for line in handle) if len(text) >= min_len]
+    except OSError:
+        return []
+
+
 def load_lines(paths: List[str], min_len: int) -> List[str]:
-    lines = []
-    for path in paths:
-        try:
-            with open(path, "rt", encoding="utf-8", errors="ignore") as handle:
-                for line in handle:
-                    text = line.rstrip("\n")
-                    if len(text) >= min_len:
-                        lines.append(text)
-        except OSError:
-            continue
-    return lines
+    # Files are read concurrently (file I/O releases the GIL) but concatenated in
+    # path order, so sampling with a given seed is unchanged.
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(paths)))) as executor:
+        per_file = list(executor.map(read_valid_lines, paths, [min_len] * len(paths)))
+    return list(chain.from_iterable(per_file))
 
 
 def main():
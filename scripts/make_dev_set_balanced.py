@@ -53,10 +53,10 @@ def main():
     in_path = os.path.join(args.out_dir, "dev_input.txt")
     ans_path = os.path.join(args.out_dir, "dev_answer.txt")
 
+    # One write per file instead of one per example.
     with open(in_path, "wt", encoding="utf-8") as fi, open(ans_path, "wt", encoding="utf-8") as fa:
-        for prefix, target in examples:
-            fi.write(prefix + "\n")
-            fa.write(target + "\n")
+        fi.write("".join(prefix + "\n" for prefix, _ in examples))
+        fa.write("".join(target + "\n" for _, target in examples))
 
     print(f"Files used: {len(stats)}")
     print(f"Total examples: {len(examples)}")
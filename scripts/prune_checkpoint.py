@@ -1,9 +1,15 @@
 #!/usr/bin/env python
 import argparse
-import gzip
 import os
-import pickle
-from collections import Counter
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SRC = os.path.join(ROOT, "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from lm.ngram_model import CharNGramLanguageModel  # noqa: E402
 
 
 def parse_args():
@@ -23,41 +29,18 @@ def parse_args():
 
 def main():
     args = parse_args()
-    with gzip.open(args.input, "rb") as handle:
-        payload = pickle.load(handle)
-
-    context_counts = payload.get("context_counts", {})
-
-    ranked = []
-    for context, counts in context_counts.items():
-        if not counts:
-            continue
-        total = sum(counts.values())
-        if total < args.min_context_count:
-            continue
-        ranked.append((context, total, counts))
-
-    ranked.sort(key=lambda item: item[1], reverse=True)
-    ranked = ranked[: args.max_contexts]
-
-    trimmed = {}
-    for context, _, counts in ranked:
-        top_items = Counter(counts).most_common(args.max_chars_per_context)
-        if top_items:
-            trimmed[context] = dict(top_items)
-
-    payload["context_counts"] = trimmed
-    payload["max_chars_per_context"] = args.max_chars_per_context
-    payload["min_context_count"] = args.min_context_count
-    payload["max_contexts"] = args.max_contexts
+    model = CharNGramLanguageModel.load_checkpoint(args.input)
+    model.max_chars_per_context = args.max_chars_per_context
+    model.min_context_count = args.min_context_count
+    model.max_contexts = args.max_contexts
+    model._trim_context_tables()
 
     os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
-    with gzip.open(args.output, "wb") as handle:
-        pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    model.save_flat(args.output)
 
     in_size = os.path.getsize(args.input)
     out_size = os.path.getsize(args.output)
-    print(f"Pruned contexts: {len(trimmed)}")
+    print(f"Pruned contexts: {len(model.context_counts)}")
     print(f"Input size:  {in_size / (1024 * 1024):.2f} MB")
     print(f"Output size: {out_size / (1024 * 1024):.2f} MB")
 
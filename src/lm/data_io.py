@@ -1,4 +1,5 @@
 import glob
+import mmap
 import os
 from typing import List
 
@@ -37,53 +38,78 @@ def load_text_lines(file_paths):
     lines = []
     for file_path in file_paths:
         try:
-            with open(file_path, "rt", encoding="utf-8", errors="ignore") as handle:
-                for line in handle:
-                    text = normalize_text(line.rstrip("\n"))
-                    if text:
-                        lines.append(text)
-                    if max_lines is not None and len(lines) >= max_lines:
-                        return lines
+            mapped = _map_file(file_path)
         except OSError:
             continue
+        if mapped is None:
+            continue
+        with mapped:
+            # Without a cap the whole file is split in one C call; with one, a
+            # cursor only decodes as many lines as are actually kept.
+            raw_lines = mapped[:].splitlines() if max_lines is None else _iter_raw_lines(mapped)
+            for raw in raw_lines:
+                text = normalize_text(raw.decode("utf-8", "ignore"))
+                if text:
+                    lines.append(text)
+                if max_lines is not None and len(lines) >= max_lines:
+                    return lines
     return lines
 
 
+def _map_file(file_path):
+    with open(file_path, "rb") as handle:
+        try:
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return None
+
+
+def _iter_raw_lines(mapped):
+    # mmap.readline only splits on "\n"; lone "\r" breaks are rare, so they are
+    # split out afterwards to match what text-mode reads return.
+    for raw in iter(mapped.readline, b""):
+        if b"\r" in raw:
+            yield from raw.splitlines()
+        else:
+            yield raw.rstrip(b"\n")
+
+
 def _load_text_lines_balanced(file_paths: List[str], max_lines: int):
     """
     Load lines in round-robin order across files to reduce language/file skew
     when training with a global line cap.
     """
+    mapped_files = []
     active = []
     for path in file_paths:
         try:
-            handle = open(path, "rt", encoding="utf-8", errors="ignore")
-            active.append(handle)
+            mapped = _map_file(path)
         except OSError:
             continue
+        if mapped is None:
+            continue
+        mapped_files.append(mapped)
+        active.append(_iter_raw_lines(mapped))
 
     lines = []
     try:
         while active and len(lines) < max_lines:
             next_active = []
-            for handle in active:
-                raw = handle.readline()
-                if not raw:
-                    handle.close()
+            for cursor in active:
+                raw = next(cursor, None)
+                if raw is None:
                     continue
-                text = normalize_text(raw.rstrip("\n"))
+                text = normalize_text(raw.decode("utf-8", "ignore"))
                 if text:
                     lines.append(text)
                     if len(lines) >= max_lines:
                         break
-                next_active.append(handle)
+                next_active.append(cursor)
             active = next_active
     finally:
-        for handle in active:
-            try:
-                handle.close()
-            except Exception:
-                pass
+        for mapped in mapped_files:
+            mapped.close()
 
     return lines
 
@@ -1,10 +1,160 @@
 import gzip
+import heapq
+import mmap
+import multiprocessing
 import os
 import pickle
-from collections import Counter, defaultdict
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 
 from .text_utils import normalize_text
 
+_GZIP_MAGIC = b"\x1f\x8b"
+_FLAT_MAGIC = b"CNGFLAT2"
+# CSR slabs of a flat checkpoint, written in this order after the metadata block.
+# Each slab's typecode is recorded in the metadata, since char ids and counts are
+# packed as narrow as the model allows.
+_FLAT_SLABS = (
+    "row_keys",
+    "row_offsets",
+    "row_totals",
+    "row_char_ids",
+    "row_counts",
+    "context_offsets",
+    "context_blob",
+)
+
+
+_KEY_BASE = 0x9E3779B97F4A7C15
+_KEY_MASK = (1 << 64) - 1
+
+
+@lru_cache(maxsize=None)
+def _key_powers(length):
+    powers = [1]
+    for _ in range(1, length):
+        powers.append((powers[-1] * _KEY_BASE) & _KEY_MASK)
+    return tuple(powers)
+
+
+def _context_key(context):
+    """
+    64-bit polynomial hash of a context, accumulated right to left so the key
+    of a longer suffix extends the key of a shorter one with one multiply-add.
+    """
+    powers = _key_powers(len(context))
+    key = 0
+    for offset, char in enumerate(reversed(context)):
+        key = (key + (ord(char) + 1) * powers[offset]) & _KEY_MASK
+    return key
+
+
+def _find_row(row_keys, key):
+    row = bisect_left(row_keys, key)
+    if row < len(row_keys) and row_keys[row] == key:
+        return row
+    return None
+
+
+@lru_cache(maxsize=None)
+def _row_matcher(max_context):
+    """
+    Build a lookup unrolled for one context length: it returns the rows matching
+    each suffix of up to max_context chars, shortest first. The key powers are
+    inlined as literals, so each level is one multiply-add and one bisect.
+    """
+    name = f"_match_rows_{max_context}"
+    source = [
+        f"def {name}(sequence, row_keys):",
+        "    hits = []",
+        "    length = len(sequence)",
+        "    n_rows = len(row_keys)",
+        "    key = 0",
+    ]
+    for offset, power in enumerate(_key_powers(max_context) if max_context > 0 else ()):
+        ctx_len = offset + 1
+        source += [
+            f"    if length < {ctx_len}:",
+            "        return hits",
+            f"    key = (key + (ord(sequence[-{ctx_len}]) + 1) * {power}) & {_KEY_MASK}",
+            "    row = bisect_left(row_keys, key)",
+            "    if row < n_rows and row_keys[row] == key:",
+            "        hits.append(row)",
+        ]
+    source.append("    return hits")
+    namespace = {"bisect_left": bisect_left}
+    exec("\n".join(source), namespace)
+    return namespace[name]
+
+
+_predict_model = None
+_predict_k = None
+
+
+def _init_predict_worker(model, k):
+    global _predict_model, _predict_k
+    _predict_model = model
+    _predict_k = k
+
+
+def _predict_worker_suffix(suffix):
+    return _predict_model._predict_or_default(suffix, _predict_k)
+
+
+class FlatContextCounts(Mapping):
+    """
+    Read-only context -> {next_char: count} view over the CSR slabs of a flat
+    checkpoint. Rows are decoded on access rather than materialized at load.
+    """
+
+    def __init__(self, id_to_char, slabs):
+        self._id_to_char = id_to_char
+        self._row_keys = slabs["row_keys"]
+        self._row_offsets = slabs["row_offsets"]
+        self._row_totals = slabs["row_totals"]
+        self._row_char_ids = slabs["row_char_ids"]
+        self._row_counts = slabs["row_counts"]
+        self._context_offsets = slabs["context_offsets"]
+        self._context_blob = slabs["context_blob"]
+
+    def __getitem__(self, context):
+        row = _find_row(self._row_keys, _context_key(context))
+        if row is None or self._context(row) != context:
+            raise KeyError(context)
+        return self._row(row)
+
+    def __iter__(self):
+        return map(self._context, range(len(self)))
+
+    def __len__(self):
+        return len(self._row_keys)
+
+    def items(self):
+        for row in range(len(self)):
+            yield self._context(row), self._row(row)
+
+    def values(self):
+        return map(self._row, range(len(self)))
+
+    def totals(self):
+        return dict(zip(self, self._row_totals))
+
+    def _context(self, row):
+        start, end = self._context_offsets[row], self._context_offsets[row + 1]
+        return str(self._context_blob[start:end], "utf-8")
+
+    def _row(self, row):
+        start, end = self._row_offsets[row], self._row_offsets[row + 1]
+        chars = map(self._id_to_char.__getitem__, self._row_char_ids[start:end])
+        return dict(zip(chars, self._row_counts[start:end]))
+
 
 class CharNGramLanguageModel:
     def __init__(
@@ -23,86 +173,228 @@ class CharNGramLanguageModel:
         self.max_contexts = int(max_contexts)
         self.kn_discount = float(kn_discount)
         self.context_counts = defaultdict(Counter)
+        # Row totals of context_counts while fit builds and trims the rows, so
+        # trimming can rank contexts without re-summing them. _finalize clears
+        # it; afterwards context_counts.totals() reads them from the slabs.
+        self.context_totals = {}
         self.unigram = Counter()
         self.continuation_counts = Counter()
         self.total_bigram_types = 0
         self.default_chars = [" ", ".", ",", "。", "،", "।", "，", "・", "-"]
-        self._base_unigram_scores = {}
-        self._base_unigram_ranking = []
-        self._context_runtime = {}
-        self._prediction_cache = {}
+        self._id_to_char = []
+        self._base_scores = array("d")
+        self._base_ranking_size = 0
+        self._row_keys = array("Q")
+        self._row_offsets = array("q", [0])
+        self._row_totals = array("q")
+        self._row_char_ids = array("i")
+        self._row_counts = array("q")
+        self._context_offsets = array("q", [0])
+        self._context_blob = bytearray()
+        self._prediction_cache = OrderedDict()
         self._prediction_cache_max = 100000
+        # Matched rows per suffix. They only depend on the packed tables, so unlike
+        # predictions they stay valid when kn_discount or laplace_alpha change.
+        self._suffix_rows = OrderedDict()
         self._runtime_signature = None
 
     def fit(self, lines):
-        max_context = self.ngram_order - 1
-        unique_bigrams = set()
-
-        for raw_line in lines:
-            sequence = normalize_text(raw_line)
-            for idx, next_char in enumerate(sequence):
+        sequences = [normalize_text(raw_line) for raw_line in lines]
+        unigram = Counter()
+        for sequence in sequences:
+            unigram.update(sequence)
+        for char in ("\n", "\r"):
+            unigram.pop(char, None)
+        self.unigram.update(unigram)
+
+        # Count one context length per pass, Intergrams style: a context can only
+        # survive trimming if its prefix one char shorter survived the previous
+        # pass (that prefix's total is at least as large, unless the context
+        # ends in a newline; see below), so each pass only keeps
+        # rows whose prefix is still alive and peak memory is a single width's
+        # grams plus the pruned rows. Plain dict rows are enough here;
+        # _trim_context_tables wraps the final survivors in Counters.
+        # A context also cannot reach min_context_count if it occurred fewer
+        # times than that as a gram in the previous pass, so only contexts that
+        # were frequent there and whose own prefix survived are worth a row.
+        existing = {context: dict(counts) for context, counts in self.context_counts.items()}
+        min_count = self.min_context_count
+        rows = {}
+        row_totals = {}
+        candidates = None
+        if self.ngram_order < 2:
+            # No context rows are built, but the base scores still need the
+            # continuation counts from the bigram types.
+            self._count_continuations(self._count_grams(sequences, 2))
+        for width in range(2, self.ngram_order + 1):
+            width_rows = {
+                context: row for context, row in existing.items() if len(context) == width - 1
+            }
+            gram_counts = self._count_grams(sequences, width)
+            if width == 2:
+                self._count_continuations(gram_counts)
+            frequent = []
+            # Walk the grams in first-occurrence order so rows and the chars in
+            # them are inserted in the same order as a single left-to-right scan,
+            # which is what breaks ties at the trimming cutoffs. Rows are still
+            # grouped by length, so a max_contexts tie between two lengths goes
+            # to the shorter context rather than the one seen first.
+            for gram, count in gram_counts.items():
+                if count >= min_count:
+                    frequent.append(gram)
+                next_char = gram[-1]
                 if next_char in ("\n", "\r"):
                     continue
-
-                self.unigram[next_char] += 1
-
-                start = max(0, idx - max_context)
-                for left in range(start, idx):
-                    context = sequence[left:idx]
-                    if context:
-                        self.context_counts[context][next_char] += 1
-
-                if idx > 0:
-                    left_char = sequence[idx - 1]
-                    if left_char not in ("\n", "\r"):
-                        pair = (left_char, next_char)
-                        if pair not in unique_bigrams:
-                            unique_bigrams.add(pair)
-                            self.continuation_counts[next_char] += 1
-
-        self.total_bigram_types = len(unique_bigrams)
+                context = gram[:-1]
+                if candidates is not None and context not in candidates:
+                    continue
+                row = width_rows.get(context)
+                if row is None:
+                    width_rows[context] = {next_char: count}
+                else:
+                    row[next_char] = row.get(next_char, 0) + count
+            del gram_counts
+
+            kept, totals = self._prune_width_rows(width_rows)
+            for context in kept:
+                rows[context] = width_rows[context]
+                row_totals[context] = totals[context]
+            surviving = set(kept)
+            # A prefix's total leaves out newline continuations, so a context
+            # ending in a newline can outgrow its prefix and only the frequency
+            # gate applies to it.
+            candidates = {
+                gram for gram in frequent if gram[-1] in ("\n", "\r") or gram[:-1] in surviving
+            }
+            candidates.update(context for context in existing if len(context) == width)
+
+        self.context_counts = defaultdict(Counter, rows)
+        self.context_totals = row_totals
         self._trim_context_tables()
         self._refresh_default_chars()
+        self._finalize()
+
+    def _count_continuations(self, bigram_counts):
+        # A char's continuation count is the number of distinct chars it
+        # follows, so it can be tallied in one pass over the bigram types.
+        continuations = [
+            gram[1]
+            for gram in bigram_counts
+            if gram[0] not in ("\n", "\r") and gram[1] not in ("\n", "\r")
+        ]
+        self.total_bigram_types = len(continuations)
+        self.continuation_counts.update(continuations)
+
+    def _finalize(self):
+        """
+        Pack the trimmed tables into CSR rows and serve context_counts from
+        them, so the per-context Counters built during fit can be released.
+        """
         self._rebuild_runtime_tables()
+        slabs = {name: getattr(self, "_" + name) for name in _FLAT_SLABS}
+        self.context_counts = FlatContextCounts(self._id_to_char, slabs)
+        # The row_totals slab holds the same numbers; context_counts.totals()
+        # rebuilds the dict if a later trim needs it.
+        self.context_totals = {}
+        self._runtime_signature = self._build_runtime_signature()
+
+    @staticmethod
+    def _count_grams(sequences, width):
+        gram_counts = Counter()
+        for sequence in sequences:
+            length = len(sequence)
+            starts = range(length - width + 1)
+            gram_counts.update(map(sequence.__getitem__, map(slice, starts, range(width, length + 1))))
+        return gram_counts
+
+    def _prune_width_rows(self, width_rows):
+        totals = {context: sum(row.values()) for context, row in width_rows.items()}
+        kept = [context for context, total in totals.items() if total >= self.min_context_count]
+        if 0 < self.max_contexts < len(kept):
+            kept = heapq.nlargest(self.max_contexts, kept, key=totals.__getitem__)
+        return kept, totals
 
     def predict_top_k(self, text, k=3):
         self._ensure_runtime_tables()
-        sequence = normalize_text(text)
+        return self._predict_suffix(self._context_suffix(normalize_text(text)), k)
+
+    def _context_suffix(self, sequence):
         max_context = self.ngram_order - 1
+        return sequence[-max_context:] if max_context > 0 else ""
 
-        suffix = sequence[-max_context:] if max_context > 0 else ""
-        cache_key = (suffix, int(k))
+    def _predict_suffix(self, sequence, k):
+        cache_key = (sequence, int(k))
         cached = self._prediction_cache.get(cache_key)
         if cached is not None:
             return list(cached)
 
+        max_context = self.ngram_order - 1
+        discount = self.kn_discount
+        offsets = self._row_offsets
+        hits = self._suffix_rows.get(sequence)
+        if hits is None:
+            hits = _row_matcher(max_context)(sequence, self._row_keys)
+            if len(self._suffix_rows) >= self._prediction_cache_max:
+                self._suffix_rows.popitem(last=False)
+            self._suffix_rows[sequence] = hits
+
+        # Blend from the longest context down with a running product of the
+        # backoff weights, so each level is scaled once as it is added instead
+        # of rescaling everything accumulated so far at every longer level.
+        row_totals = self._row_totals
+        row_char_ids = self._row_char_ids
+        row_counts = self._row_counts
         backoff_scale = 1.0
         additive = {}
-        for ctx_len in range(1, min(max_context, len(sequence)) + 1):
-            context = sequence[-ctx_len:]
-            runtime = self._context_runtime.get(context)
-            if not runtime:
-                continue
-
-            lambda_val, level = runtime
-            if additive and lambda_val != 1.0:
-                for char in list(additive.keys()):
-                    additive[char] *= lambda_val
-            backoff_scale *= lambda_val
-            for char, score in level.items():
-                additive[char] = additive.get(char, 0.0) + score
+        # Branch and bound: what the levels below a row can still add to any char
+        # is at most backoff_scale times rest_bounds for that row (its largest
+        # discounted count plus its backoff weight times the bound below it,
+        # bottoming out at the largest base score). Once the top k are further
+        # apart than that, the shorter contexts cannot reorder them. The bound
+        # never drops below the largest base score, since stopping early still
+        # adds backoff_scale times each char's base score.
+        can_settle = 0.0 < discount <= 1.0 and k > 0 and len(hits) > 1
+        if can_settle:
+            base_bound = self._base_scores[0] if self._base_ranking_size else 0.0
+            bound = base_bound
+            rest_bounds = []
+            for row in hits:
+                rest_bounds.append(bound)
+                start, end = offsets[row], offsets[row + 1]
+                total = row_totals[row]
+                bound = max(
+                    base_bound,
+                    (max(row_counts[start:end]) - discount) / total
+                    + (discount * (end - start)) / total * bound,
+                )
+        for level, row in enumerate(reversed(hits), 1):
+            start, end = offsets[row], offsets[row + 1]
+            total = row_totals[row]
+            for char_id, count in zip(row_char_ids[start:end], row_counts[start:end]):
+                discounted = (count - discount) / total
+                if discounted > 0.0:
+                    additive[char_id] = additive.get(char_id, 0.0) + backoff_scale * discounted
+            backoff_scale *= (discount * (end - start)) / total
+            if can_settle and level < len(hits) and len(additive) >= k:
+                top = heapq.nlargest(k + 1, additive.values())
+                top.append(0.0)
+                slack = backoff_scale * rest_bounds[len(hits) - level]
+                if all(top[index] - top[index + 1] > slack for index in range(k)):
+                    break
 
+        id_to_char = self._id_to_char
+        base_scores = self._base_scores
         candidate_scores = []
-        for char, score in additive.items():
+        for char_id, score in additive.items():
             candidate_scores.append(
-                (char, score + backoff_scale * self._base_unigram_scores.get(char, 0.0))
+                (id_to_char[char_id], score + backoff_scale * base_scores[char_id])
             )
 
         added_backoff = 0
-        for char in self._base_unigram_ranking:
-            if char in additive:
+        for char_id in range(self._base_ranking_size):
+            if char_id in additive:
                 continue
-            candidate_scores.append((char, backoff_scale * self._base_unigram_scores.get(char, 0.0)))
+            candidate_scores.append((id_to_char[char_id], backoff_scale * base_scores[char_id]))
             added_backoff += 1
             if added_backoff >= k:
                 break
@@ -129,7 +421,10 @@ class CharNGramLanguageModel:
 
         result = guesses[:k]
         if len(self._prediction_cache) >= self._prediction_cache_max:
-            self._prediction_cache.clear()
+            # FIFO eviction instead of dropping every cached suffix at once when
+            # the cache fills up. OrderedDict pops its oldest entry in O(1); a
+            # plain dict has to skip the deleted slots at its front first.
+            self._prediction_cache.popitem(last=False)
         self._prediction_cache[cache_key] = tuple(result)
         return result
 
@@ -151,41 +446,154 @@ class CharNGramLanguageModel:
                 scores[char] = (count + self.laplace_alpha) / (total + self.laplace_alpha * vocab_size)
         return scores
 
-    def predict_batch(self, inputs, k=3):
-        predictions = []
-        for line in inputs:
-            try:
-                top_k = self.predict_top_k(line, k=k)
-            except Exception:
-                top_k = self.default_chars[:k]
-                while len(top_k) < k:
-                    top_k.append(" ")
-            predictions.append("".join(top_k))
+    def predict_batch(self, inputs, k=3, n_workers=1):
+        self._ensure_runtime_tables()
+
+        # Predictions only depend on the last max_context characters, so score each
+        # distinct suffix once and fan the result out to every line sharing it.
+        lines_by_suffix = {}
+        for index, line in enumerate(inputs):
+            suffix = self._context_suffix(normalize_text(line))
+            lines_by_suffix.setdefault(suffix, []).append(index)
+
+        suffixes = list(lines_by_suffix)
+        if n_workers <= 0:
+            n_workers = os.cpu_count() or 1
+        if (
+            n_workers > 1
+            and len(suffixes) >= 256
+            and "fork" in multiprocessing.get_all_start_methods()
+        ):
+            # Forked workers inherit the model (and any mapped checkpoint pages)
+            # instead of unpickling a copy each.
+            with ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_predict_worker,
+                initargs=(self, k),
+            ) as executor:
+                chunksize = max(1, len(suffixes) // (4 * n_workers))
+                results = executor.map(_predict_worker_suffix, suffixes, chunksize=chunksize)
+                top_ks = list(results)
+        else:
+            top_ks = [self._predict_or_default(suffix, k) for suffix in suffixes]
+
+        predictions = [""] * len(inputs)
+        for suffix, top_k in zip(suffixes, top_ks):
+            prediction = "".join(top_k)
+            for index in lines_by_suffix[suffix]:
+                predictions[index] = prediction
         return predictions
 
+    def _predict_or_default(self, suffix, k):
+        try:
+            return self._predict_suffix(suffix, k)
+        except Exception:
+            top_k = self.default_chars[:k]
+            while len(top_k) < k:
+                top_k.append(" ")
+            return top_k
+
     def save(self, work_dir):
-        payload = {
-            "ngram_order": self.ngram_order,
-            "laplace_alpha": self.laplace_alpha,
-            "max_chars_per_context": self.max_chars_per_context,
-            "min_context_count": self.min_context_count,
-            "max_contexts": self.max_contexts,
-            "kn_discount": self.kn_discount,
-            "context_counts": {ctx: dict(c) for ctx, c in self.context_counts.items()},
+        self.save_flat(os.path.join(work_dir, "model.checkpoint"))
+
+    def save_flat(self, path):
+        """
+        Write a flat checkpoint: magic, pickled metadata, then the CSR slabs
+        8-byte aligned so load_flat can map them in place.
+        """
+        self._ensure_runtime_tables()
+        slabs = [(name, getattr(self, "_" + name)) for name in _FLAT_SLABS]
+        meta = {
+            "params": self._hyperparameters(),
             "unigram": dict(self.unigram),
             "continuation_counts": dict(self.continuation_counts),
             "total_bigram_types": self.total_bigram_types,
             "default_chars": self.default_chars,
+            "id_to_char": self._id_to_char,
+            "base_ranking_size": self._base_ranking_size,
+            "byteorder": sys.byteorder,
+            "slabs": [(name, memoryview(slab).format, len(slab)) for name, slab in slabs],
         }
-        checkpoint_path = os.path.join(work_dir, "model.checkpoint")
-        with gzip.open(checkpoint_path, "wb") as handle:
-            pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        meta_bytes = pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL)
+        # A loaded model's slabs are mapped from the checkpoint it came from, so
+        # write beside it and swap the file in rather than truncating it.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(_FLAT_MAGIC)
+            handle.write(struct.pack("<Q", len(meta_bytes)))
+            handle.write(meta_bytes)
+            for _, slab in slabs:
+                handle.write(bytes(-handle.tell() % 8))
+                handle.write(slab)
+        os.replace(tmp_path, path)
 
     @classmethod
     def load(cls, work_dir):
-        checkpoint_path = os.path.join(work_dir, "model.checkpoint")
-        with gzip.open(checkpoint_path, "rb") as handle:
-            payload = pickle.load(handle)
+        return cls.load_checkpoint(os.path.join(work_dir, "model.checkpoint"))
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        with open(path, "rb") as handle:
+            magic = handle.read(len(_FLAT_MAGIC))
+        if magic.startswith(_GZIP_MAGIC):
+            return cls._load_pickled(path)
+        return cls.load_flat(path)
+
+    @classmethod
+    def load_flat(cls, path):
+        """
+        Memory-map a flat checkpoint. Slabs stay backed by the file, so pages
+        fault in lazily as predictions touch them.
+        """
+        with open(path, "rb") as handle:
+            view = memoryview(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+        if view[: len(_FLAT_MAGIC)] != _FLAT_MAGIC:
+            raise ValueError(f"{path} is not a flat n-gram checkpoint")
+        position = len(_FLAT_MAGIC) + 8
+        if position > len(view):
+            raise ValueError(f"{path} is truncated")
+        (meta_size,) = struct.unpack_from("<Q", view, len(_FLAT_MAGIC))
+        if position + meta_size > len(view):
+            raise ValueError(f"{path} is truncated")
+        meta = pickle.loads(view[position : position + meta_size])
+        position += meta_size
+
+        slabs = {}
+        for name, typecode, length in meta["slabs"]:
+            position += -position % 8
+            size = length * array(typecode).itemsize
+            if position + size > len(view):
+                raise ValueError(f"{path} is truncated in slab {name}")
+            slab = view[position : position + size]
+            if meta["byteorder"] != sys.byteorder:
+                slab = array(typecode, slab.tobytes())
+                slab.byteswap()
+            elif typecode != "B":
+                slab = slab.cast(typecode)
+            slabs[name] = slab
+            position += size
+
+        model = cls(**meta["params"])
+        model.context_counts = FlatContextCounts(meta["id_to_char"], slabs)
+        model.unigram = Counter(meta["unigram"])
+        model.continuation_counts = Counter(meta["continuation_counts"])
+        model.total_bigram_types = meta["total_bigram_types"]
+        model.default_chars = meta["default_chars"]
+        for name in _FLAT_SLABS:
+            setattr(model, "_" + name, slabs[name])
+        model._set_vocabulary(
+            meta["id_to_char"], meta["base_ranking_size"], model._kn_unigram_scores()
+        )
+        model._runtime_signature = model._build_runtime_signature()
+        return model
+
+    @classmethod
+    def _load_pickled(cls, path):
+        # One-shot inflate: much less Python-level overhead than GzipFile's
+        # chunked reads driven by pickle.load.
+        with open(path, "rb") as handle:
+            payload = pickle.loads(gzip.decompress(handle.read()))
 
         model = cls(
             ngram_order=payload.get("ngram_order", 6),
@@ -205,22 +613,42 @@ class CharNGramLanguageModel:
         model._rebuild_runtime_tables()
         return model
 
+    def _hyperparameters(self):
+        return {
+            "ngram_order": self.ngram_order,
+            "laplace_alpha": self.laplace_alpha,
+            "max_chars_per_context": self.max_chars_per_context,
+            "min_context_count": self.min_context_count,
+            "max_contexts": self.max_contexts,
+            "kn_discount": self.kn_discount,
+        }
+
     def _trim_context_tables(self):
-        ranked_contexts = []
-        for context, counts in self.context_counts.items():
-            total = sum(counts.values())
-            if total < self.min_context_count:
-                continue
-            ranked_contexts.append((context, total, counts))
-        ranked_contexts.sort(key=lambda item: item[1], reverse=True)
+        totals = self.context_totals
+        if not totals:
+            if isinstance(self.context_counts, FlatContextCounts):
+                totals = self.context_counts.totals()
+            else:
+                totals = {context: sum(counts.values()) for context, counts in self.context_counts.items()}
+        ranked_contexts = [context for context, total in totals.items() if total >= self.min_context_count]
+        ranked_contexts.sort(key=totals.__getitem__, reverse=True)
         if self.max_contexts > 0:
             ranked_contexts = ranked_contexts[: self.max_contexts]
         trimmed = defaultdict(Counter)
-        for context, _, counts in ranked_contexts:
-            top_items = counts.most_common(self.max_chars_per_context)
-            if top_items:
-                trimmed[context] = Counter(dict(top_items))
+        trimmed_totals = {}
+        max_chars = self.max_chars_per_context
+        for context in ranked_contexts:
+            counts = self.context_counts[context]
+            total = totals[context]
+            # Most rows are already within the cap; only rank the ones that are not.
+            if len(counts) > max_chars:
+                counts = dict(heapq.nlargest(max_chars, counts.items(), key=itemgetter(1)))
+                total = sum(counts.values())
+            if counts:
+                trimmed[context] = Counter(counts)
+                trimmed_totals[context] = total
         self.context_counts = trimmed
+        self.context_totals = trimmed_totals
         self._runtime_signature = None
 
     def _refresh_default_chars(self):
@@ -253,33 +681,84 @@ class CharNGramLanguageModel:
 
     def _ensure_runtime_tables(self):
         signature = self._build_runtime_signature()
-        if signature != self._runtime_signature:
+        if signature == self._runtime_signature:
+            return
+        if self._runtime_signature is not None and signature[:-2] == self._runtime_signature[:-2]:
+            self._refresh_smoothing()
+        else:
             self._rebuild_runtime_tables()
 
+    def _refresh_smoothing(self):
+        """
+        Only kn_discount or laplace_alpha changed. The discount is applied at
+        predict time and alpha does not reorder the base ranking, so the packed
+        rows and ids stay valid and only the base scores need recomputing.
+        """
+        self._set_vocabulary(self._id_to_char, self._base_ranking_size, self._kn_unigram_scores())
+        self._runtime_signature = self._build_runtime_signature()
+
     def _rebuild_runtime_tables(self):
+        """
+        Pack context_counts into CSR rows over one global char vocabulary.
+        Rows are sorted by 64-bit context fingerprint so lookups are a bisect,
+        and ids follow the base unigram ranking, so the first
+        _base_ranking_size ids double as the backoff candidate ranking.
+        """
         base = self._kn_unigram_scores()
-        self._base_unigram_scores = dict(base)
-        self._base_unigram_ranking = [
-            char for char, _ in base.most_common() if char not in ("\n", "\r")
-        ]
+        id_to_char = [char for char, _ in base.most_common() if char not in ("\n", "\r")]
+        base_ranking_size = len(id_to_char)
+        char_to_id = {char: char_id for char_id, char in enumerate(id_to_char)}
 
-        context_runtime = {}
-        for context, next_char_counts in self.context_counts.items():
-            total = sum(next_char_counts.values())
-            if total <= 0:
-                continue
+        seen_chars = set(self.default_chars).union(*self.context_counts.values())
+        for char in sorted(seen_chars.difference(char_to_id)):
+            char_to_id[char] = len(id_to_char)
+            id_to_char.append(char)
 
-            n_types = len(next_char_counts)
-            lambda_val = (self.kn_discount * n_types) / total
-            level = {}
-            for char, count in next_char_counts.items():
-                if char in ("\n", "\r"):
-                    continue
-                discounted = max(count - self.kn_discount, 0.0) / total
-                if discounted > 0.0:
-                    level[char] = discounted
-            context_runtime[context] = (lambda_val, level)
+        keyed_rows = []
+        context_totals = self.context_totals
+        for context, next_char_counts in self.context_counts.items():
+            total = context_totals.get(context)
+            if total is None:
+                total = sum(next_char_counts.values())
+            if total > 0:
+                keyed_rows.append((_context_key(context), context, total, next_char_counts))
+        keyed_rows.sort(key=itemgetter(0))
+
+        row_keys = array("Q")
+        offsets = array("q", [0])
+        totals = array("q")
+        # Ids follow the base ranking, so even large vocabularies usually fit 16 bits.
+        char_ids = array("H" if len(id_to_char) <= 1 << 16 else "i")
+        counts = array("q")
+        context_offsets = array("q", [0])
+        context_blob = bytearray()
+        for key, context, total, next_char_counts in keyed_rows:
+            if row_keys and row_keys[-1] == key:
+                raise ValueError(f"Context fingerprint collision on {context!r}")
+            row_keys.append(key)
+            char_ids.extend(map(char_to_id.__getitem__, next_char_counts))
+            counts.extend(next_char_counts.values())
+            offsets.append(len(char_ids))
+            totals.append(total)
+            context_blob += context.encode("utf-8")
+            context_offsets.append(len(context_blob))
+
+        if counts and max(counts) < 1 << 32:
+            counts = array("I", counts)
+
+        self._row_keys = row_keys
+        self._row_offsets = offsets
+        self._row_totals = totals
+        self._row_char_ids = char_ids
+        self._row_counts = counts
+        self._context_offsets = context_offsets
+        self._context_blob = context_blob
+        self._suffix_rows = OrderedDict()
+        self._set_vocabulary(id_to_char, base_ranking_size, base)
+        self._runtime_signature = self._build_runtime_signature()
 
-        self._context_runtime = context_runtime
+    def _set_vocabulary(self, id_to_char, base_ranking_size, base):
+        self._id_to_char = id_to_char
+        self._base_ranking_size = base_ranking_size
+        self._base_scores = array("d", [base.get(char, 0.0) for char in id_to_char])
         self._prediction_cache.clear()
-        self._runtime_signature = self._build_runtime_signature()
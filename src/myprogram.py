@@ -43,7 +43,7 @@ class MyProgram:
         model.save(work_dir)
 
     @staticmethod
-    def test(work_dir, test_data_path, test_output_path):
+    def test(work_dir, test_data_path, test_output_path, n_workers):
         print("Loading model")
         model = CharNGramLanguageModel.load(work_dir)
 
@@ -51,7 +51,7 @@ class MyProgram:
         test_data = load_test_data(test_data_path)
 
         print("Making predictions")
-        predictions = model.predict_batch(test_data, k=3)
+        predictions = model.predict_batch(test_data, k=3, n_workers=n_workers)
 
         print(f"Writing predictions to {test_output_path}")
         assert len(predictions) == len(test_data), (
@@ -97,6 +97,12 @@ def build_parser():
         default=1000000,
         help="keep only this many most frequent contexts (<=0 means no cap)",
     )
+    parser.add_argument(
+        "--n_workers",
+        type=int,
+        default=1,
+        help="worker processes for test-time prediction (<=0 means one per CPU)",
+    )
     return parser
 
 
@@ -118,6 +124,7 @@ if __name__ == "__main__":
             work_dir=args.work_dir,
             test_data_path=args.test_data,
             test_output_path=args.test_output,
+            n_workers=args.n_workers,
         )
     else:
         raise NotImplementedError(f"Unknown mode {args.mode}")
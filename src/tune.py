@@ -10,13 +10,16 @@ ngram_order별로 한 번만 훈련하고,
     python src/tune.py
 """
 
+import contextlib
 import copy
 import itertools
+import multiprocessing
 import os
 import random
 import sys
 import time
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.insert(0, os.path.dirname(__file__))
 from lm.ngram_model import CharNGramLanguageModel
@@ -39,6 +42,10 @@ DEV_SEED       = 42
 RESULT_FILE    = "tune_results.txt"
 EXAMPLE_INPUT  = "example/input.txt"
 EXAMPLE_ANSWER = "example/answer.txt"
+# trim 조합을 fork한 프로세스에서 병렬 평가. worker마다 trim된 Counter 테이블을
+# 따로 만들므로 (30만 context ≈ 150MB, max_contexts=1000000이면 그 이상)
+# peak 메모리는 worker 수에 비례 → 기본값은 작게 제한.
+TRIAL_WORKERS  = min(2, os.cpu_count() or 1)
 # ────────────────────────────────────────────────────────────────
 
 
@@ -75,12 +82,15 @@ def evaluate(model, inputs, answers):
 
 def apply_trim_params(base_model, min_context_count, max_contexts):
     """
-    base_model의 raw context_counts를 복사해서
+    base_model의 raw context_counts에
     min_context_count, max_contexts만 바꿔 trim 재적용.
     재훈련 없이 새 model 반환.
     """
+    # trim은 raw counts를 읽기만 하고 새 테이블을 만들므로 deepcopy 없이 공유.
     m = copy.copy(base_model)
-    m.context_counts = copy.deepcopy(base_model.raw_context_counts)
+    m.context_counts = base_model.raw_context_counts
+    m.context_totals = base_model.raw_context_totals
+    m._prediction_cache = OrderedDict()
     m.min_context_count = min_context_count
     m.max_contexts = max_contexts
     m._trim_context_tables()
@@ -88,6 +98,36 @@ def apply_trim_params(base_model, min_context_count, max_contexts):
     return m
 
 
+_trial_base_model = None
+_trial_eval_sets = None
+
+
+def _init_trial_worker(base_model, eval_sets):
+    global _trial_base_model, _trial_eval_sets
+    _trial_base_model = base_model
+    _trial_eval_sets = eval_sets
+
+
+def run_trim_trials(min_context_count, max_contexts):
+    """
+    trim 조합 하나에 대해 모든 (kn_discount, laplace_alpha)를 평가.
+    [(kn_d, lap_a, ex_correct, ex_total, dev_correct, dev_total), ...] 반환.
+    """
+    m = apply_trim_params(_trial_base_model, min_context_count, max_contexts)
+    (ex_inputs, ex_answers), (dev_inputs, dev_answers) = _trial_eval_sets
+    trials = []
+    for kn_d, lap_a in itertools.product(
+        PARAM_GRID["kn_discount"],
+        PARAM_GRID["laplace_alpha"],
+    ):
+        m.kn_discount   = kn_d
+        m.laplace_alpha = lap_a
+        ex_correct,  ex_total  = evaluate(m, ex_inputs,  ex_answers)
+        dev_correct, dev_total = evaluate(m, dev_inputs, dev_answers)
+        trials.append((kn_d, lap_a, ex_correct, ex_total, dev_correct, dev_total))
+    return trials
+
+
 def main():
     total_combos = 1
     for v in PARAM_GRID.values():
@@ -118,7 +158,8 @@ def main():
             **FIXED,
         )
         base_model.fit(train_data)
-        base_model.raw_context_counts = copy.deepcopy(base_model.context_counts)
+        base_model.raw_context_counts = base_model.context_counts
+        base_model.raw_context_totals = base_model.raw_context_counts.totals()
         print(f"완료 ({time.time()-t0:.1f}s)")
 
         trim_combos = list(itertools.product(
@@ -126,42 +167,52 @@ def main():
             PARAM_GRID["max_contexts"],
         ))
 
-        for min_cc, max_ctx in trim_combos:
-            m = apply_trim_params(base_model, min_cc, max_ctx)
-
-            for kn_d, lap_a in itertools.product(
-                PARAM_GRID["kn_discount"],
-                PARAM_GRID["laplace_alpha"],
-            ):
-                m.kn_discount   = kn_d
-                m.laplace_alpha = lap_a
-
-                ex_correct,  ex_total  = evaluate(m, ex_inputs,  ex_answers)
-                dev_correct, dev_total = evaluate(m, dev_inputs, dev_answers)
-                done += 1
-
-                params = {
-                    "ngram_order":       ngram_order,
-                    "kn_discount":       kn_d,
-                    "laplace_alpha":     lap_a,
-                    "min_context_count": min_cc,
-                    "max_contexts":      max_ctx,
-                }
-                r = {
-                    "params":  params,
-                    "ex":      (ex_correct, ex_total),
-                    "dev":     (dev_correct, dev_total),
-                    "ex_acc":  ex_correct  / ex_total,
-                    "dev_acc": dev_correct / dev_total,
-                }
-                results.append(r)
-
-                elapsed = time.time() - t_start
-                avg     = elapsed / done
-                eta     = avg * (total_combos - done)
-                print(f"    [{done:>4}/{total_combos}]  ETA {eta:>5.0f}s  "
-                      f"ex={ex_correct}/{ex_total}  dev={dev_correct/dev_total:.4f}  "
-                      f"discount={kn_d}  alpha={lap_a}  mcc={min_cc}  maxctx={max_ctx}")
+        eval_sets = ((ex_inputs, ex_answers), (dev_inputs, dev_answers))
+        min_ccs = [min_cc for min_cc, _ in trim_combos]
+        max_ctxs = [max_ctx for _, max_ctx in trim_combos]
+        workers = min(TRIAL_WORKERS, len(trim_combos))
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # fork된 worker는 base_model을 copy-on-write로 공유 (pickle 없음).
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_trial_worker,
+                initargs=(base_model, eval_sets),
+            )
+            trial_map = executor.map
+        else:
+            executor = contextlib.nullcontext()
+            _init_trial_worker(base_model, eval_sets)
+            trial_map = map
+
+        with executor:
+            trial_results = trial_map(run_trim_trials, min_ccs, max_ctxs)
+            for (min_cc, max_ctx), trials in zip(trim_combos, trial_results):
+                for kn_d, lap_a, ex_correct, ex_total, dev_correct, dev_total in trials:
+                    done += 1
+
+                    params = {
+                        "ngram_order":       ngram_order,
+                        "kn_discount":       kn_d,
+                        "laplace_alpha":     lap_a,
+                        "min_context_count": min_cc,
+                        "max_contexts":      max_ctx,
+                    }
+                    r = {
+                        "params":  params,
+                        "ex":      (ex_correct, ex_total),
+                        "dev":     (dev_correct, dev_total),
+                        "ex_acc":  ex_correct  / ex_total,
+                        "dev_acc": dev_correct / dev_total,
+                    }
+                    results.append(r)
+
+                    elapsed = time.time() - t_start
+                    avg     = elapsed / done
+                    eta     = avg * (total_combos - done)
+                    print(f"    [{done:>4}/{total_combos}]  ETA {eta:>5.0f}s  "
+                          f"ex={ex_correct}/{ex_total}  dev={dev_correct/dev_total:.4f}  "
+                          f"discount={kn_d}  alpha={lap_a}  mcc={min_cc}  maxctx={max_ctx}")
 
     results.sort(key=lambda x: x["dev_acc"], reverse=True)
     keys = list(PARAM_GRID.keys())